@@ -2,8 +2,9 @@
 
 import argparse
 import asyncio
-from itertools import islice
+import json
 from pathlib import Path
+from typing import Any
 
 import litellm
 import pandas as pd
@@ -11,21 +12,16 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, ConfigDict
 from tqdm import tqdm
 
+from src.cache.extraction_cache import ExtractionCache
 from src.clients.llm import LLMClient
 from src.prompts.lib_stats import LIBS_METRICS_EXTRACTION_PROMPT
-from src.utils import remove_emojis
+from src.utils import EMOJI_PATTERN
 
 load_dotenv()
 
 MODEL_NAME = "openai/gpt-5-mini"
 TEMPERATURE = 0.0
-
-
-# --- Input payload model --- #
-class PlacePayload(BaseModel):
-    place_id: int
-    place_name: str
-    description: str
+DEFAULT_CACHE_DIR = "data/cache/lib_stats"
 
 
 # --- Output response model --- #
@@ -42,23 +38,19 @@ class PlaceMetricsResponse(BaseModel):
     rows: list[PlaceMetricsRow]
 
 
-def batch_payload(items: list[PlacePayload], max_places: int = 25):
-    it = iter(items)
-    chunk = list(islice(it, max_places))
-    while chunk:
-        yield chunk
-        chunk = list(islice(it, max_places))
-
-
-def _clean_text(s: str) -> str:
-    s = (s or "").strip()
-    s = remove_emojis(s)
-    s = " ".join(s.split())
-    return s
+def _clean_column(s: pd.Series) -> pd.Series:
+    # strip emojis and collapse whitespace in one vectorized pass per step
+    return (
+        s.fillna("")
+        .astype(str)
+        .str.replace(EMOJI_PATTERN, "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
 
 
 def load_places(places_csv: Path) -> pd.DataFrame:
-    df = pd.read_csv(places_csv)
+    df = pd.read_csv(places_csv, engine="pyarrow")
 
     required = {"place_id", "place_name", "description"}
     missing = required - set(df.columns)
@@ -66,25 +58,20 @@ def load_places(places_csv: Path) -> pd.DataFrame:
         raise ValueError(f"places.csv missing required columns: {sorted(missing)}")
 
     df["place_id"] = df["place_id"].astype(int)
-    df["place_name"] = df["place_name"].fillna("").astype(str).map(_clean_text)
-    df["description"] = df["description"].fillna("").astype(str).map(_clean_text)
+    df["place_name"] = _clean_column(df["place_name"])
+    df["description"] = _clean_column(df["description"])
 
     df = df.sort_values("place_id").reset_index(drop=True)
     return df
 
 
-def build_place_payloads(df: pd.DataFrame) -> list[PlacePayload]:
-    places: list[PlacePayload] = []
-    for r in df[["place_id", "place_name", "description"]].itertuples(index=False):
-        places.append(
-            PlacePayload(
-                place_id=int(r.place_id),
-                place_name=str(r.place_name),
-                description=str(r.description),
-            )
-        )
-    places.sort(key=lambda p: p.place_id)
-    return places
+def build_place_payloads(df: pd.DataFrame) -> list[dict[str, Any]]:
+    # df comes from load_places already sorted by place_id; the payload goes
+    # straight to the LLM, so plain dicts suffice — no model round-trip
+    records = df[["place_id", "place_name", "description"]].to_dict(orient="records")
+    for r in records:
+        r["place_id"] = int(r["place_id"])  # numpy scalar -> JSON-safe int
+    return records
 
 
 async def main_async() -> None:
@@ -95,6 +82,17 @@ async def main_async() -> None:
     ap.add_argument("--max-concurrency", type=int, default=20)
     ap.add_argument("--n-retries", type=int, default=2)
     ap.add_argument("--retry-delay-s", type=float, default=1.0)
+    ap.add_argument(
+        "--max-inflight-tokens",
+        type=int,
+        default=None,
+        help="Estimated prompt-token budget across in-flight requests",
+    )
+    ap.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="LLM response cache directory; empty string disables caching",
+    )
     args = ap.parse_args()
 
     places_csv = Path(args.places_csv)
@@ -113,6 +111,7 @@ async def main_async() -> None:
         max_concurrency=args.max_concurrency,
         n_retries=args.n_retries,
         retry_delay_s=args.retry_delay_s,
+        max_inflight_tokens=args.max_inflight_tokens,
     )
 
     places_df = load_places(places_csv)
@@ -123,44 +122,87 @@ async def main_async() -> None:
     if not places:
         raise SystemExit("No valid places to process (no place_id rows).")
 
-    batches = list(batch_payload(places, max_places=args.max_places))
-    tasks: list[asyncio.Task[PlaceMetricsResponse]] = []
-
-    for i, batch in enumerate(batches, start=1):
-        print(f"[batch {i}/{len(batches)}] places={len(batch)}")
-
-        tasks.append(
-            asyncio.create_task(
-                client.structured_call_async(
-                    response_format=PlaceMetricsResponse,
-                    payload=[b.model_dump() for b in batch],
-                    user_prefix="ВХОД:\n",
-                )
+    cache = ExtractionCache(Path(args.cache_dir)) if args.cache_dir else None
+
+    async def call_batch(batch: list[dict[str, Any]]) -> PlaceMetricsResponse:
+        # serialized once: reused for the cache key and the prompt itself
+        payload_json = json.dumps(batch, sort_keys=True, ensure_ascii=False)
+        key = ""
+        if cache:
+            key = cache.make_key(
+                MODEL_NAME,
+                LIBS_METRICS_EXTRACTION_PROMPT,
+                str(TEMPERATURE),
+                payload_json,
             )
+            cached = cache.get(key)
+            if cached is not None:
+                try:
+                    return PlaceMetricsResponse.model_validate_json(cached)
+                except Exception:
+                    cache.evict(key)  # schema drifted; refetch
+
+        resp = await client.structured_call_async(
+            response_format=PlaceMetricsResponse,
+            payload=batch,
+            user_prefix="ВХОД:\n",
+            payload_json=payload_json,
         )
-
+        if cache:
+            cache.put(key, resp.model_dump_json())
+        return resp
+
+    # bounded producer/consumer: batches are generated lazily and only
+    # O(max_concurrency) of them exist in memory at once
+    queue: asyncio.Queue[list[dict[str, Any]] | None] = asyncio.Queue(
+        maxsize=args.max_concurrency
+    )
     all_rows: list[PlaceMetricsRow] = []
-    for fut in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
-        resp = await fut
-        all_rows.extend(resp.rows)
-
-    metrics_df = pd.DataFrame([r.model_dump() for r in all_rows])
+    total_batches = -(-len(places) // args.max_places)
+    progress = tqdm(total=total_batches, unit="batch")
+
+    async def producer() -> None:
+        for i in range(0, len(places), args.max_places):
+            await queue.put(places[i : i + args.max_places])
+        for _ in range(args.max_concurrency):
+            await queue.put(None)
+
+    async def worker() -> None:
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return
+            resp = await call_batch(batch)
+            all_rows.extend(resp.rows)
+            progress.update(1)
+
+    await asyncio.gather(
+        producer(), *(worker() for _ in range(args.max_concurrency))
+    )
+    progress.close()
+
+    # columnar construction: one attribute pass, no per-row dicts
+    metrics_df = pd.DataFrame(
+        {
+            "place_id": [r.place_id for r in all_rows],
+            "readers_count": [r.readers_count for r in all_rows],
+            "book_collection_size": [r.book_collection_size for r in all_rows],
+            "is_school_library": [r.is_school_library for r in all_rows],
+        }
+    )
     if metrics_df.empty:
         raise SystemExit("LLM returned no rows.")
 
-    # Keep exactly one row per place_id (prefer the first occurrence)
-    metrics_df = (
-        metrics_df.sort_values("place_id")
-        .drop_duplicates(subset=["place_id"], keep="first")
-        .reset_index(drop=True)
-    )
+    # Keep exactly one row per place_id (prefer the first occurrence);
+    # output order comes from the merge onto the already-sorted places_df
+    metrics_df = metrics_df.drop_duplicates(subset=["place_id"], keep="first")
 
-    # Ensure column order
-    metrics_df = metrics_df[
-        ["place_id", "readers_count", "book_collection_size", "is_school_library"]
-    ]
-    
-    df_out = places_df.merge(metrics_df, on="place_id", how="left")
+    # indexed join: metrics_df is unique on place_id, places_df already sorted
+    df_out = (
+        places_df.set_index("place_id")
+        .join(metrics_df.set_index("place_id"), how="left")
+        .reset_index()
+    )
     df_out = df_out.drop(columns="description")
 
     df_out.to_csv(out_csv, index=False)
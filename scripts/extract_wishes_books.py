@@ -24,27 +24,29 @@ class BookWishExtractor(BaseWishExtractor[BookWishExtractionResponse]):
     def get_response_format(self) -> type[BookWishExtractionResponse]:
         return BookWishExtractionResponse
 
-    def clean_results(self, results: list[BookWishExtractionResponse]) -> pd.DataFrame:
-        """Clean and deduplicate book wish results."""
-        if not results:
-            return pd.DataFrame()
-
-        df = pd.DataFrame([r.model_dump() for r in results])
+    def clean_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clean and deduplicate raw book wish rows."""
+        if df.empty:
+            return df
 
         # Clean fields
-        df["author"] = df["author"].fillna("").str.strip()
-        df["book_title"] = df["book_title"].fillna("").str.strip()
+        df["author"] = df["author"].fillna("").astype(str).str.strip()
+        df["book_title"] = df["book_title"].fillna("").astype(str).str.strip()
         df["confidence"] = pd.to_numeric(df["confidence"], errors="coerce").fillna(0.0)
 
         # Filter empty titles
-        df = df[df["book_title"] != ""]
+        df = df[df["book_title"].str.len() > 0]
         if df.empty:
             return df
 
-        # Deduplicate - keep highest confidence
-        df = df.groupby(
-            ["place_id", "group_id", "topic_id", "author", "book_title"], as_index=False
-        )["confidence"].max()
+        # Deduplicate - keep highest confidence; one stable sort +
+        # drop_duplicates beats a hash-groupby over object columns
+        df = df.sort_values(
+            "confidence", ascending=False, kind="mergesort"
+        ).drop_duplicates(
+            subset=["place_id", "group_id", "topic_id", "author", "book_title"],
+            keep="first",
+        )
 
         return df.sort_values(
             ["place_id", "group_id", "topic_id", "author", "book_title"]
@@ -111,9 +113,17 @@ async def main_async() -> None:
 
     extractor = BookWishExtractor(config, client)
 
-    # Load data
-    topics_df = pd.read_csv(topics_path)
-    messages_df = pd.read_csv(messages_path)
+    # Load data; only the columns the filter/join actually touch
+    topics_df = pd.read_csv(
+        topics_path,
+        engine="pyarrow",
+        usecols=["place_id", "group_id", "topic_id", "topic_type", "topic_title"],
+    )
+    messages_df = pd.read_csv(
+        messages_path,
+        engine="pyarrow",
+        usecols=["place_id", "group_id", "topic_id", "message_idx", "message_text"],
+    )
 
     # Filter messages
     book_messages = extractor.filter_messages_by_type(topics_df, messages_df)
@@ -35,19 +35,15 @@ class NonbookWishExtractor(BaseWishExtractor[NonbookWishExtractionResponse]):
     def get_response_format(self) -> type[NonbookWishExtractionResponse]:
         return NonbookWishExtractionResponse
 
-    def clean_results(
-        self, results: list[NonbookWishExtractionResponse]
-    ) -> pd.DataFrame:
-        """Clean and deduplicate nonbook wish results."""
-        if not results:
-            return pd.DataFrame()
-
-        df = pd.DataFrame([r.model_dump() for r in results])
+    def clean_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clean and deduplicate raw nonbook wish rows."""
+        if df.empty:
+            return df
 
         # Clean fields
-        df["object_name"] = df["object_name"].fillna("").str.strip()
-        df["category"] = df["category"].fillna("").str.strip()
-        df["object_url"] = df["object_url"].fillna("").str.strip()
+        df["object_name"] = df["object_name"].fillna("").astype(str).str.strip()
+        df["category"] = df["category"].fillna("").astype(str).str.strip()
+        df["object_url"] = df["object_url"].fillna("").astype(str).str.strip()
         df["confidence"] = pd.to_numeric(df["confidence"], errors="coerce").fillna(0.0)
 
         # Apply filters
@@ -60,9 +56,12 @@ class NonbookWishExtractor(BaseWishExtractor[NonbookWishExtractionResponse]):
         if df.empty:
             return df
 
-        # Deduplicate - keep highest confidence
-        df = df.groupby(
-            [
+        # Deduplicate - keep highest confidence; one stable sort +
+        # drop_duplicates beats a hash-groupby over object columns
+        df = df.sort_values(
+            "confidence", ascending=False, kind="mergesort"
+        ).drop_duplicates(
+            subset=[
                 "place_id",
                 "group_id",
                 "topic_id",
@@ -70,8 +69,9 @@ class NonbookWishExtractor(BaseWishExtractor[NonbookWishExtractionResponse]):
                 "category",
                 "object_url",
             ],
-            as_index=False,
-        )["confidence"].max()
+            keep="first",
+            ignore_index=True,
+        )
 
         return df.sort_values(
             [
@@ -146,9 +146,17 @@ async def main_async() -> None:
 
     extractor = NonbookWishExtractor(config, client)
 
-    # Load data
-    topics_df = pd.read_csv(topics_path)
-    messages_df = pd.read_csv(messages_path)
+    # Load data; only the columns the filter/join actually touch
+    topics_df = pd.read_csv(
+        topics_path,
+        engine="pyarrow",
+        usecols=["place_id", "group_id", "topic_id", "topic_type", "topic_title"],
+    )
+    messages_df = pd.read_csv(
+        messages_path,
+        engine="pyarrow",
+        usecols=["place_id", "group_id", "topic_id", "message_idx", "message_text"],
+    )
 
     # Filter messages
     nonbook_messages = extractor.filter_messages_by_type(topics_df, messages_df)
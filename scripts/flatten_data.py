@@ -1,5 +1,7 @@
 import argparse
+import csv
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, NamedTuple, Optional
@@ -51,11 +53,15 @@ class Config:
 
 
 class FlattenedData(NamedTuple):
-    """Container for flattened data from a single place."""
+    """Container for flattened data from a single place.
 
-    place_data: dict[str, Any]
-    topics_data: list[dict[str, Any]]
-    messages_data: list[dict[str, Any]]
+    Rows are plain tuples in PLACES_COLUMNS / TOPICS_COLUMNS /
+    MESSAGES_COLUMNS order — no per-row dict overhead.
+    """
+
+    place_data: tuple[Any, ...]
+    topics_data: list[tuple[Any, ...]]
+    messages_data: list[tuple[Any, ...]]
 
 
 def setup_config() -> Config:
@@ -111,7 +117,7 @@ def validate_config(config: Config) -> None:
 
 def load_geo_data(geo_csv_path: Path) -> pd.DataFrame:
     """Load and validate geo data CSV."""
-    geo_df = pd.read_csv(geo_csv_path)
+    geo_df = pd.read_csv(geo_csv_path, engine="pyarrow")
 
     required_columns = {"number", "name", "lat", "lon", "link"}
     missing_columns = required_columns - set(geo_df.columns)
@@ -141,9 +147,9 @@ def load_group_data(groups_dir: Path, place_id: int) -> Optional[BoardWithPlaceI
         return None
 
     try:
-        return BoardWithPlaceId.model_validate_json(
-            json_path.read_text(encoding="utf-8")
-        )
+        # pydantic-core parses bytes directly in Rust: one pass, no
+        # intermediate Python dict tree and no str decode
+        return BoardWithPlaceId.model_validate_json(json_path.read_bytes())
     except Exception as e:
         logger.warning("Failed to parse JSON for place %s: %s", place_id, e)
         return None
@@ -157,126 +163,119 @@ def flatten_place_data(
     vk_url: str,
     board_with_place: Optional[BoardWithPlaceId],
 ) -> FlattenedData:
-    """Flatten data for a single place using Pydantic models."""
-    place_row: dict[str, Any] = {
-        "place_id": place_id,
-        "place_name": (place_name or "").strip(),
-        "lat": lat,
-        "lon": lon,
-        "vk_url": (vk_url or "").strip(),
-        "group_id": None,
-        "group_name": None,
-        "screen_name": None,
-        "members_count": None,
-        "description": None,
-    }
-
-    topics_data: list[dict[str, Any]] = []
-    messages_data: list[dict[str, Any]] = []
+    """Flatten data for a single place into column-ordered row tuples."""
+    topics_data: list[tuple[Any, ...]] = []
+    messages_data: list[tuple[Any, ...]] = []
 
     if board_with_place is None:
+        place_row = (
+            place_id,
+            (place_name or "").strip(),
+            lat,
+            lon,
+            (vk_url or "").strip(),
+            None,
+            None,
+            None,
+            None,
+            None,
+        )
         return FlattenedData(place_row, topics_data, messages_data)
 
     group = board_with_place.board.group
-    place_row.update(
-        {
-            "group_id": group.id,
-            "group_name": group.name,
-            "screen_name": group.screen_name,
-            "members_count": group.members_count,
-            "description": group.description,
-        }
+    place_row = (
+        place_id,
+        (place_name or "").strip(),
+        lat,
+        lon,
+        (vk_url or "").strip(),
+        group.id,
+        group.name,
+        group.screen_name,
+        group.members_count,
+        group.description,
     )
 
-    for topic in sorted(board_with_place.board.topics, key=lambda t: t.topic_id):
+    # dump_board already emits topics sorted by topic_id
+    for topic in board_with_place.board.topics:
         topic_title = (topic.title or "").strip()
         topics_data.append(
-            {
-                "place_id": place_id,
-                "group_id": group.id,
-                "topic_id": topic.topic_id,
-                "topic_title": topic_title,
-                "message_count": len(topic.messages),
-            }
+            (place_id, group.id, topic.topic_id, topic_title, len(topic.messages))
         )
 
         for message_idx, message_text in enumerate(topic.messages):
             messages_data.append(
-                {
-                    "place_id": place_id,
-                    "group_id": group.id,
-                    "topic_id": topic.topic_id,
-                    "message_idx": message_idx,
-                    "message_text": message_text,
-                }
+                (place_id, group.id, topic.topic_id, message_idx, message_text)
             )
 
     return FlattenedData(place_row, topics_data, messages_data)
 
 
-def process_all_places(
-    geo_df: pd.DataFrame,
-    groups_dir: Path,
-) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, int]:
-    """Process all places and return DataFrames with missing count."""
-    all_place_data: list[dict[str, Any]] = []
-    all_topic_data: list[dict[str, Any]] = []
-    all_message_data: list[dict[str, Any]] = []
-    missing_count = 0
-
-    for row in geo_df.sort_values("place_id").itertuples(index=False):
-        place_id = int(row.place_id)
-
-        board_with_place = load_group_data(groups_dir, place_id)
-        if board_with_place is None:
-            missing_count += 1
-
-        flattened = flatten_place_data(
-            place_id=place_id,
-            place_name=row.place_name,
-            lat=row.lat,
-            lon=row.lon,
-            vk_url=row.vk_url,
-            board_with_place=board_with_place,
-        )
-
-        all_place_data.append(flattened.place_data)
-        all_topic_data.extend(flattened.topics_data)
-        all_message_data.extend(flattened.messages_data)
-
-    places_df = pd.DataFrame(all_place_data, columns=PLACES_COLUMNS).sort_values(
-        "place_id"
+def process_place(
+    task: tuple[int, str, float, float, str, Path],
+) -> tuple[FlattenedData, bool]:
+    """Load and flatten one place; top-level so it pickles for worker processes."""
+    place_id, place_name, lat, lon, vk_url, groups_dir = task
+    board_with_place = load_group_data(groups_dir, place_id)
+    flattened = flatten_place_data(
+        place_id=place_id,
+        place_name=place_name,
+        lat=lat,
+        lon=lon,
+        vk_url=vk_url,
+        board_with_place=board_with_place,
     )
+    return flattened, board_with_place is None
 
-    topics_df = pd.DataFrame(all_topic_data, columns=TOPICS_COLUMNS)
-    if not topics_df.empty:
-        topics_df = topics_df.sort_values(["place_id", "topic_id"])
 
-    messages_df = pd.DataFrame(all_message_data, columns=MESSAGES_COLUMNS)
-    if not messages_df.empty:
-        messages_df = messages_df.sort_values(["place_id", "topic_id", "message_idx"])
-
-    return places_df, topics_df, messages_df, missing_count
-
-
-def save_dataframes(
-    places_df: pd.DataFrame,
-    topics_df: pd.DataFrame,
-    messages_df: pd.DataFrame,
+def process_all_places(
+    geo_df: pd.DataFrame,
+    groups_dir: Path,
     output_dir: Path,
-) -> None:
-    """Save DataFrames to CSV files."""
+) -> tuple[int, int, int, int]:
+    """Stream flattened rows straight to the CSVs and return row counts.
+
+    JSON parsing and flattening fan out to a process pool (pydantic
+    validation of big dumps is CPU-bound); ProcessPoolExecutor.map keeps
+    results in submission order, so rows still stream out sorted by
+    place_id with topics and messages in (topic_id, message_idx) order.
+    """
     output_dir.mkdir(parents=True, exist_ok=True)
-
-    outputs: list[tuple[str, pd.DataFrame, Path]] = [
-        ("places", places_df, output_dir / "places.csv"),
-        ("topics", topics_df, output_dir / "topics.csv"),
-        ("messages", messages_df, output_dir / "messages.csv"),
-    ]
-
-    for name, df, path in outputs:
-        df.to_csv(path, index=False)
-        logger.info("Saved %d rows to %s (%s)", len(df), path, name)
+    place_count = topic_count = message_count = missing_count = 0
+
+    with (
+        open(output_dir / "places.csv", "w", newline="", encoding="utf-8") as pf,
+        open(output_dir / "topics.csv", "w", newline="", encoding="utf-8") as tf,
+        open(output_dir / "messages.csv", "w", newline="", encoding="utf-8") as mf,
+    ):
+        places_writer = csv.writer(pf)
+        topics_writer = csv.writer(tf)
+        messages_writer = csv.writer(mf)
+        places_writer.writerow(PLACES_COLUMNS)
+        topics_writer.writerow(TOPICS_COLUMNS)
+        messages_writer.writerow(MESSAGES_COLUMNS)
+
+        tasks = [
+            (int(row.place_id), row.place_name, row.lat, row.lon, row.vk_url, groups_dir)
+            for row in geo_df.sort_values("place_id").itertuples(index=False)
+        ]
+
+        with ProcessPoolExecutor() as executor:
+            for flattened, missing in executor.map(
+                process_place, tasks, chunksize=16
+            ):
+                if missing:
+                    missing_count += 1
+
+                places_writer.writerow(flattened.place_data)
+                topics_writer.writerows(flattened.topics_data)
+                messages_writer.writerows(flattened.messages_data)
+
+                place_count += 1
+                topic_count += len(flattened.topics_data)
+                message_count += len(flattened.messages_data)
+
+    return place_count, topic_count, message_count, missing_count
 
 
 def main():
@@ -295,15 +294,13 @@ def main():
         geo_df = load_geo_data(config.geo_csv_path)
         logger.info("Loaded geo data for %d places", len(geo_df))
 
-        places_df, topics_df, messages_df, missing_count = process_all_places(
-            geo_df, config.groups_dir
+        place_count, topic_count, message_count, missing_count = process_all_places(
+            geo_df, config.groups_dir, config.output_dir
         )
 
-        save_dataframes(places_df, topics_df, messages_df, config.output_dir)
-
-        logger.info("Processed %d places", len(places_df))
-        logger.info("Extracted %d topics", len(topics_df))
-        logger.info("Extracted %d messages", len(messages_df))
+        logger.info("Processed %d places", place_count)
+        logger.info("Extracted %d topics", topic_count)
+        logger.info("Extracted %d messages", message_count)
 
         if missing_count:
             logger.warning("Missing or invalid JSON files for %d places", missing_count)
@@ -1,8 +1,10 @@
 import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import NamedTuple
 
+import orjson
 import pandas as pd
 from dotenv import load_dotenv
 from tqdm import tqdm
@@ -16,6 +18,9 @@ load_dotenv()
 DEFAULT_SINGLE_OUTPUT = Path("data/external/group_data.json")
 DEFAULT_BATCH_OUTPUT_DIR = Path("data/external/groups")
 
+# boards fetched concurrently; VKClient.call backs off on rate-limit errors
+MAX_PARALLEL_BOARDS = 4
+
 
 class GroupTask(NamedTuple):
     place_id: int
@@ -24,7 +29,10 @@ class GroupTask(NamedTuple):
 
 def load_tasks(csv_path: Path) -> list[GroupTask]:
     df = pd.read_csv(csv_path, usecols=["number", "link"])
-    return [GroupTask(row.number, row.link) for _, row in df.iterrows()]
+    return [
+        GroupTask(int(number), link)
+        for number, link in zip(df["number"].to_list(), df["link"].to_list())
+    ]
 
 
 def fetch_board(
@@ -38,28 +46,47 @@ def fetch_board(
 
 
 def save_board(board: BoardWithPlaceId, output_path: Path) -> None:
+    """Stream the dump topic-by-topic to keep peak memory at one topic."""
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(
-        board.model_dump_json(indent=2, ensure_ascii=False), encoding="utf-8"
-    )
+    with open(output_path, "wb") as f:
+        f.write(b'{"place_id":%d,"board":{"group":' % board.place_id)
+        f.write(orjson.dumps(board.board.group.model_dump()))
+        f.write(b',"topics":[')
+        for i, topic in enumerate(board.board.topics):
+            if i:
+                f.write(b",")
+            f.write(orjson.dumps(topic.model_dump()))
+        f.write(b"]}}")
 
 
 def process_batch(
-    service: VKBoardService, tasks: list[GroupTask], output_dir: Path
+    service: VKBoardService,
+    tasks: list[GroupTask],
+    output_dir: Path,
+    force: bool = False,
 ) -> tuple[int, int]:
-    success_count = 0
-    failure_count = 0
+    # resolve all groups up front: one getById call per 500 slugs
+    groups = service.get_groups([task.url for task in tasks])
 
-    for task in tqdm(tasks):
+    def dump_one(task: GroupTask) -> bool:
         output_path = output_dir / f"place_{task.place_id}.json"
-        board = fetch_board(service, task.url, task.place_id)
-        if board:
-            save_board(board, output_path)
-            success_count += 1
-        else:
-            failure_count += 1
+        # reruns skip places already dumped, saving VK quota
+        if not force and output_path.exists() and output_path.stat().st_size > 0:
+            return True
 
-    return success_count, failure_count
+        group = groups.get(task.url)
+        if not group:
+            return False
+
+        board = service.dump_board(group)
+        save_board(BoardWithPlaceId(place_id=task.place_id, board=board), output_path)
+        return True
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_BOARDS) as pool:
+        results = list(tqdm(pool.map(dump_one, tasks), total=len(tasks)))
+
+    success_count = sum(results)
+    return success_count, len(results) - success_count
 
 
 def get_auth_token(token_arg: str | None) -> str:
@@ -78,6 +105,11 @@ def main() -> None:
     parser.add_argument("--out", help="Output file for single group")
     parser.add_argument("--outdir", help="Output directory for batch processing")
     parser.add_argument("--token", help="VK API token (or use VK_TOKEN env var)")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Refetch groups even when their output JSON already exists",
+    )
 
     args = parser.parse_args()
     token = get_auth_token(args.token)
@@ -94,7 +126,7 @@ def main() -> None:
     else:
         output_dir = Path(args.outdir) if args.outdir else DEFAULT_BATCH_OUTPUT_DIR
         tasks = load_tasks(Path(args.csv))
-        success, failure = process_batch(service, tasks, output_dir)
+        success, failure = process_batch(service, tasks, output_dir, force=args.force)
         print(f"Processed {len(tasks)} groups: {success} successful, {failure} failed")
 
 
@@ -1,16 +1,20 @@
 import argparse
-import json
+import csv
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
 from urllib.parse import parse_qs, quote, urlparse
 
-import pandas as pd
+import orjson
 import regex
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from bs4 import BeautifulSoup
 from bs4.element import AttributeValueList
-from pydantic import BaseModel
 
 
-class Point(BaseModel):
+@dataclass(slots=True)
+class Point:
     number: int
     name: str
     lat: float
@@ -22,6 +26,16 @@ MAP_URL = "https://yandex.ru/maps/?l=mrc&ll=53.493467%2C65.320153&mode=usermaps&
 EMPTY_POINT_NAME = "пустой номер"
 DEFAULT_SAVING_PATH = "data/external/geo_points.csv"
 
+WIDGET_HOSTS = ("yandex.com", "yandex.ru")
+
+WIDGET_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0",
+    "Accept-Language": "ru,en;q=0.8",
+    "Accept": "text/html,*/*",
+    "Referer": "https://yandex.ru/",
+    "Connection": "keep-alive",
+}
+
 
 def extract_constructor_id(maps_url: str) -> str | None:
     um = parse_qs(urlparse(maps_url).query).get("um", [None])[0]
@@ -30,26 +44,63 @@ def extract_constructor_id(maps_url: str) -> str | None:
     return um.split("constructor:", 1)[1]
 
 
-def build_widget_url(constructor_id: str, lang: str = "ru_RU") -> str:
-    um = quote(f"constructor:{constructor_id}")
-    return f"https://yandex.com/map-widget/v1/?lang=ru_RU&scroll=true&source=constructor&um={um}"
+@lru_cache(maxsize=1024)
+def _um(constructor_id: str) -> str:
+    return quote(f"constructor:{constructor_id}")
+
+
+def build_widget_url(constructor_id: str, host: str = "yandex.com") -> str:
+    um = _um(constructor_id)
+    return f"https://{host}/map-widget/v1/?lang=ru_RU&scroll=true&source=constructor&um={um}"
+
 
+@lru_cache(maxsize=1024)
+def build_widget_urls(constructor_id: str) -> tuple[str, ...]:
+    return tuple(build_widget_url(constructor_id, host) for host in WIDGET_HOSTS)
 
-def extract_user_map_from_html(html: str) -> dict | None:
-    m = regex.search(r'"userMap"\s*:\s*(\{(?:[^{}]|(?1))*\})', html or "")
+
+# recursive pattern: (?1) re-enters the braced group to match balanced JSON;
+# bytes-level so the response body never needs a full decode to str
+USER_MAP_PATTERN = regex.compile(rb'"userMap"\s*:\s*(\{(?:[^{}]|(?1))*\})')
+
+
+def extract_user_map_from_html(html: bytes) -> dict | None:
+    # cheap C-level scan first: skips the recursive engine entirely when
+    # the key cannot occur (error pages, truncated responses)
+    if not html or b'"userMap"' not in html:
+        return None
+    m = USER_MAP_PATTERN.search(html)
     if not m:
         return None
     try:
-        obj = json.loads(m.group(1))
+        obj = orjson.loads(m.group(1))
     except Exception:
         return None
     return obj if isinstance(obj, dict) else None
 
 
+HREF_PATTERN = regex.compile(r"<a[^>]+href=[\"']([^\"']+)[\"']", regex.I)
+
+
+@lru_cache(maxsize=4096)
 def extract_link_from_html(html: str) -> str | None:
+    # pure function, and template-generated features repeat the same
+    # snippet verbatim — memoizing skips repeat regex/soup work
     if not html:
         return None
-    soup = BeautifulSoup(html, "html.parser")
+
+    hrefs = HREF_PATTERN.findall(html)
+    if hrefs:
+        for href in hrefs:
+            if "vk.com" in href:
+                return href.strip() or None
+        return hrefs[0].strip() or None
+
+    if "<a" not in html:
+        return None
+
+    # fallback for markup the regex can't see (e.g. unquoted href values)
+    soup = BeautifulSoup(html, "lxml")
     a = soup.select_one('a[href*="vk.com"]') or soup.select_one("a[href]")
     if not a:
         return None
@@ -77,57 +128,85 @@ def points_from_user_map(user_map: dict) -> list[Point]:
     if not isinstance(feats, list):
         return []
 
-    valid: list[dict] = []
-    for f in feats:
-        coords = f.get("coordinates") if isinstance(f, dict) else None
-        if isinstance(coords, list) and len(coords) >= 2:
-            valid.append(f)
-
+    # filter first so the valid count is known up front and numbers can be
+    # assigned during construction instead of a renumbering pass
+    valid = [
+        f
+        for f in feats
+        if isinstance(f, dict)
+        and isinstance(f.get("coordinates"), list)
+        and len(f["coordinates"]) >= 2
+    ]
     total = len(valid)
-    points: list[Point] = []
-
-    for i, f in enumerate(valid):
-        lon, lat = f["coordinates"][:2]
-        points.append(
-            Point(
-                number=total - i,
-                name=str(f.get("title") or f.get("caption") or "unknown").strip(),
-                lat=float(lat),
-                lon=float(lon),
-                link=extract_link_from_feature(f),
-            )
+    return [
+        Point(
+            number=total - i,
+            name=str(f.get("title") or f.get("caption") or "unknown").strip(),
+            lat=float(f["coordinates"][1]),
+            lon=float(f["coordinates"][0]),
+            link=extract_link_from_feature(f),
         )
+        for i, f in enumerate(valid)
+    ]
 
-    return points
-
-
-def parse_points_from_constructor(maps_url: str) -> list[Point]:
-    cid = extract_constructor_id(maps_url)
-    if not cid:
-        return []
 
+@lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    """Shared session with a sized connection pool and retry policy."""
     sess = requests.Session()
-    sess.headers.update(
-        {
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0",
-            "Accept-Language": "ru,en;q=0.8",
-            "Accept": "text/html,*/*",
-            "Referer": "https://yandex.ru/",
-            "Connection": "keep-alive",
-        }
+    adapter = HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+        ),
     )
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    sess.headers.update(WIDGET_HEADERS)
+    return sess
+
 
-    url = build_widget_url(cid)
+def _get_body(sess: requests.Session, url: str) -> bytes:
     try:
         r = sess.get(url, timeout=20)
     except requests.RequestException:
+        return b""
+    return r.content
+
+
+@lru_cache(maxsize=32)
+def fetch_user_map(constructor_id: str) -> dict | None:
+    """Fetch and parse the widget userMap; cached per constructor_id.
+
+    All host variants are requested concurrently; the first response with a
+    parseable userMap wins and the remaining fetches are cancelled.
+    """
+    sess = get_session()
+
+    urls = build_widget_urls(constructor_id)
+    with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+        futures = [pool.submit(_get_body, sess, url) for url in urls]
+        for fut in as_completed(futures):
+            user_map = extract_user_map_from_html(fut.result())
+            if user_map:
+                pool.shutdown(cancel_futures=True)
+                return user_map
+
+    return None
+
+
+def parse_points_from_constructor(maps_url: str) -> list[Point]:
+    cid = extract_constructor_id(maps_url)
+    if not cid:
         return []
 
-    user_map = extract_user_map_from_html(r.text)
+    user_map = fetch_user_map(cid)
     if not user_map:
         return []
-    places = points_from_user_map(user_map)
-    return places
+    return points_from_user_map(user_map)
 
 
 def is_empty_point(point: Point) -> bool:
@@ -139,8 +218,14 @@ def is_empty_point(point: Point) -> bool:
 
 
 def save_csv(points: list[Point], path: str) -> None:
-    df = pd.DataFrame([p.model_dump() for p in points if not is_empty_point(p)])
-    df.to_csv(path, index=False)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["number", "name", "lat", "lon", "link"])
+        w.writerows(
+            (p.number, p.name, p.lat, p.lon, p.link or "")
+            for p in points
+            if not is_empty_point(p)
+        )
 
 
 if __name__ == "__main__":
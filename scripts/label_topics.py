@@ -1,23 +1,25 @@
 import argparse
 import asyncio
-from itertools import islice
+import csv
 from pathlib import Path
 from typing import Any, Literal
 
 import litellm
 import pandas as pd
 from dotenv import load_dotenv
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from tqdm import tqdm
 
+from src.cache.extraction_cache import ExtractionCache
 from src.clients.llm import LLMClient
 from src.prompts.topic_labeling import TOPIC_LABELING_PROMPT
-from src.utils import remove_emojis
+from src.utils import EMOJI_PATTERN
 
 load_dotenv()
 
 MODEL_NAME = "openai/gpt-5-mini"
 TEMPERATURE = 0.0
+DEFAULT_CACHE_DIR = "data/cache/label_topics"
 
 # Safety to reduce prompt bloat from extremely long first messages
 MAX_FIRST_MESSAGE_CHARS = 200
@@ -29,6 +31,10 @@ class TopicsPayload(BaseModel):
     topics: list[dict[str, Any]]  # each dict has: topic_id, topic_title, first_message
 
 
+# serializes a whole batch to JSON in pydantic-core, no model_dump round-trip
+_BATCH_ADAPTER = TypeAdapter(list[TopicsPayload])
+
+
 # --- Output response model --- #
 TopicType = Literal["book_wish", "nonbook_wish", "thank", "other"]
 
@@ -46,14 +52,6 @@ class TopicLabelingResponse(BaseModel):
     rows: list[TopicLabelRow]
 
 
-def batch_payload(places: list[TopicsPayload], max_places: int = 25):
-    it = iter(places)
-    chunk = list(islice(it, max_places))
-    while chunk:
-        yield chunk
-        chunk = list(islice(it, max_places))
-
-
 def load_topics_with_first_message(
     topics_df: pd.DataFrame, messages_df: pd.DataFrame
 ) -> pd.DataFrame:
@@ -61,15 +59,19 @@ def load_topics_with_first_message(
         topics_df["topic_title"].fillna("").astype(str).str.strip()
     )
 
-    # Get first message per (place_id, topic_id) by smallest message_idx
-    first_df = (
-        messages_df.sort_values(["place_id", "topic_id", "message_idx"])
-        .groupby(["place_id", "topic_id"], as_index=False)
-        .first()[["place_id", "topic_id", "message_text"]]
-        .rename(columns={"message_text": "first_message"})
+    # Get first message per (place_id, topic_id) by smallest message_idx;
+    # idxmin picks the rows in one group scan without sorting the whole frame
+    idx = messages_df.groupby(["place_id", "topic_id"], sort=False)[
+        "message_idx"
+    ].idxmin()
+    first_df = messages_df.loc[idx, ["place_id", "topic_id", "message_text"]].rename(
+        columns={"message_text": "first_message"}
     )
     first_df["first_message"] = (
-        first_df["first_message"].fillna("").astype(str).apply(remove_emojis)
+        first_df["first_message"]
+        .fillna("")
+        .astype(str)
+        .str.replace(EMOJI_PATTERN, "", regex=True)
     )
 
     # Left join so topics without messages still exist
@@ -77,9 +79,7 @@ def load_topics_with_first_message(
     out["first_message"] = out["first_message"].fillna("")
 
     # Truncate for payload safety (keeps behavior stable; avoids context blowups)
-    out["first_message"] = out["first_message"].map(
-        lambda s: s[:MAX_FIRST_MESSAGE_CHARS]
-    )
+    out["first_message"] = out["first_message"].str.slice(0, MAX_FIRST_MESSAGE_CHARS)
 
     # Stable ordering
     out = out.sort_values(["place_id", "topic_id"]).reset_index(drop=True)
@@ -90,22 +90,27 @@ def build_place_payloads(df: pd.DataFrame) -> list[TopicsPayload]:
     places: list[TopicsPayload] = []
 
     df = df.dropna(subset=["place_id", "topic_id"]).copy()
-    df["place_id"] = df["place_id"].astype(int)
-    df["topic_id"] = df["topic_id"].astype(int)
+    df["place_id"] = df["place_id"].astype("int64")
+    df["topic_id"] = df["topic_id"].astype("int64")
+    # one global sort; groups keep this order, so no per-group sort_values
+    df = df.sort_values(["place_id", "topic_id"])
 
     for place_id, g in df.groupby("place_id", sort=True):
-        g = g.sort_values("topic_id")
         topics = [
             {
-                "topic_id": int(r.topic_id),
-                "topic_title": str(r.topic_title),
-                "first_message": str(r.first_message),
+                "topic_id": int(tid),
+                "topic_title": str(title),
+                "first_message": str(msg),
             }
-            for r in g.itertuples(index=False)
+            for tid, title, msg in zip(
+                g["topic_id"].to_numpy(),
+                g["topic_title"].to_numpy(),
+                g["first_message"].to_numpy(),
+            )
         ]
         places.append(TopicsPayload(place_id=int(place_id), topics=topics))
 
-    places.sort(key=lambda p: p.place_id)
+    # groupby(sort=True) already yields places in ascending place_id order
     return places
 
 
@@ -118,6 +123,11 @@ async def main_async() -> None:
     ap.add_argument("--max-concurrency", type=int, default=20)
     ap.add_argument("--n-retries", type=int, default=2)
     ap.add_argument("--retry-delay-s", type=float, default=1.0)
+    ap.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="LLM response cache directory; empty string disables caching",
+    )
     args = ap.parse_args()
 
     topics_csv = Path(args.topics_csv)
@@ -141,8 +151,14 @@ async def main_async() -> None:
         n_retries=args.n_retries,
         retry_delay_s=args.retry_delay_s,
     )
-    topics_df = pd.read_csv(topics_csv)
-    messages_df = pd.read_csv(messages_csv)
+    # topics_df keeps all columns (they flow through to the output merge);
+    # messages.csv is the big file and only four columns are used
+    topics_df = pd.read_csv(topics_csv, engine="pyarrow")
+    messages_df = pd.read_csv(
+        messages_csv,
+        engine="pyarrow",
+        usecols=["place_id", "topic_id", "message_idx", "message_text"],
+    )
 
     enriched_df = load_topics_with_first_message(topics_df, messages_df)
     if enriched_df.empty:
@@ -152,29 +168,58 @@ async def main_async() -> None:
     if not places:
         raise SystemExit("No places to label (no valid place_id/topic_id rows).")
 
-    all_rows: list[TopicLabelRow] = []
-    batches = list(batch_payload(places, max_places=args.max_places))
+    cache = ExtractionCache(Path(args.cache_dir)) if args.cache_dir else None
+
+    async def call_batch(batch: list[TopicsPayload]) -> TopicLabelingResponse:
+        # serialized once: reused for the cache key and the prompt itself
+        payload_json = _BATCH_ADAPTER.dump_json(batch).decode()
+        key = ""
+        if cache:
+            key = cache.make_key(
+                MODEL_NAME, TOPIC_LABELING_PROMPT, str(TEMPERATURE), payload_json
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                try:
+                    return TopicLabelingResponse.model_validate_json(cached)
+                except Exception:
+                    cache.evict(key)  # schema drifted; refetch
+
+        resp = await client.structured_call_async(
+            response_format=TopicLabelingResponse,
+            payload=None,
+            user_prefix="ВХОД:\n",
+            payload_json=payload_json,
+        )
+        if cache:
+            cache.put(key, resp.model_dump_json())
+        return resp
+
+    # plain slicing: one pass over the pre-sorted list, no iterator state
+    n = args.max_places
+    batches = [places[i : i + n] for i in range(0, len(places), n)]
 
     tasks: list[asyncio.Task[TopicLabelingResponse]] = []
     for i, batch in enumerate(batches, start=1):
         total_topics = sum(len(p.topics) for p in batch)
         print(f"[batch {i}/{len(batches)}] places={len(batch)} topics={total_topics}")
 
-        tasks.append(
-            asyncio.create_task(
-                client.structured_call_async(
-                    response_format=TopicLabelingResponse,
-                    payload=[b.model_dump() for b in batch],
-                    user_prefix="ВХОД:\n",
-                )
-            )
-        )
+        tasks.append(asyncio.create_task(call_batch(batch)))
 
-    for fut in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
-        resp = await fut
-        all_rows.extend(resp.rows)
+    # stream label rows to disk as batches finish: peak memory stays at one
+    # response, and a crashed run leaves usable partial output behind
+    labels_csv = out_csv.with_name(out_csv.stem + "_raw.csv")
+    with labels_csv.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=["place_id", "topic_id", "topic_type", "confidence"]
+        )
+        writer.writeheader()
+        for fut in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
+            resp = await fut
+            writer.writerows(row.model_dump() for row in resp.rows)
+            f.flush()
 
-    topic_labels_df = pd.DataFrame([row.model_dump() for row in all_rows])
+    topic_labels_df = pd.read_csv(labels_csv)
     if not topic_labels_df.empty:
         topic_labels_df = topic_labels_df.sort_values(["place_id", "topic_id"])
 
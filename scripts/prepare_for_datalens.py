@@ -1,4 +1,5 @@
 import argparse
+import os
 import shutil
 from pathlib import Path
 
@@ -14,6 +15,16 @@ def _ensure_exists(path: Path) -> None:
         raise FileNotFoundError(f"File not found: {path}")
 
 
+def _fast_copy(src: Path, dst: Path) -> None:
+    # hard-link is O(1) on the same filesystem; fall back to a real copy
+    # across devices (or on filesystems without link support)
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
 def _build_geopoint(lat_series: pd.Series, lon_series: pd.Series) -> pd.Series:
     # geopoint as JSON list string: "[lat,lon]" (lat first)
     lat = (
@@ -26,12 +37,11 @@ def _build_geopoint(lat_series: pd.Series, lon_series: pd.Series) -> pd.Series:
     lat_num = pd.to_numeric(lat, errors="coerce")
     lon_num = pd.to_numeric(lon, errors="coerce")
 
-    def fmt(a, b) -> str:
-        if pd.isna(a) or pd.isna(b):
-            return ""
-        return f"[{a:.8f},{b:.8f}]"
+    mask = lat_num.notna() & lon_num.notna()
+    lat_s = lat_num.fillna(0).map("{:.8f}".format)
+    lon_s = lon_num.fillna(0).map("{:.8f}".format)
 
-    return pd.Series([fmt(a, b) for a, b in zip(lat_num, lon_num)])
+    return ("[" + lat_s + "," + lon_s + "]").where(mask, "")
 
 
 def main() -> None:
@@ -69,8 +79,8 @@ def main() -> None:
     # --- copy wishes as-is ---
     books_out = out_dir / "wishes_book.csv"
     nonbooks_out = out_dir / "wishes_nonbook.csv"
-    shutil.copy2(wishes_books_in, books_out)
-    shutil.copy2(wishes_nonbooks_in, nonbooks_out)
+    _fast_copy(wishes_books_in, books_out)
+    _fast_copy(wishes_nonbooks_in, nonbooks_out)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+import hashlib
+from pathlib import Path
+
+
+class ExtractionCache:
+    """Disk-backed cache of LLM responses keyed by a content hash.
+
+    Stores the raw response JSON one file per key, so reruns of an
+    extraction script skip the LLM call for unchanged payloads.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Hash the parts with length prefixes so boundaries can't collide."""
+        h = hashlib.sha256()
+        for part in parts:
+            data = part.encode("utf-8")
+            h.update(len(data).to_bytes(8, "big"))
+            h.update(data)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        try:
+            return self._path(key).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        self._path(key).write_text(text, encoding="utf-8")
+
+    def evict(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
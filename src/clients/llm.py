@@ -1,13 +1,49 @@
 import asyncio
-import json
+import hashlib
+import random
+from collections import OrderedDict
 from typing import Any, TypeVar
 
+import httpx
+import litellm
+import orjson
 from litellm import acompletion
 from loguru import logger
 from pydantic import BaseModel
 
 T = TypeVar("T", bound=BaseModel)
 
+# rough chars-per-token ratio used for prompt size estimates
+CHARS_PER_TOKEN = 4
+
+# in-memory exact-match response cache entries per client
+RESPONSE_CACHE_SIZE = 4096
+
+
+class WeightedSemaphore:
+    """Counting semaphore where each acquire takes a variable weight."""
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self._available = capacity
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, weight: int = 1) -> None:
+        # oversized requests are clamped so they still run (alone)
+        weight = min(weight, self.capacity)
+        async with self._cond:
+            while self._available < weight:
+                await self._cond.wait()
+            self._available -= weight
+
+    async def release(self, weight: int = 1) -> None:
+        weight = min(weight, self.capacity)
+        async with self._cond:
+            self._available = min(self.capacity, self._available + weight)
+            self._cond.notify_all()
+
 
 class LLMClient:
     def __init__(
@@ -18,6 +54,7 @@ class LLMClient:
         max_concurrency: int = 5,
         n_retries: int = 2,
         retry_delay_s: float = 1.0,
+        max_inflight_tokens: int | None = None,
         **completion_kwargs: Any,
     ):
         if max_concurrency < 1:
@@ -30,23 +67,53 @@ class LLMClient:
         self.model_name = model_name
         self.temperature = temperature
         self.system_prompt = system_prompt.strip()
+        # immutable after init; one shared dict instead of one per call
+        self._system_msg = {"role": "system", "content": self.system_prompt}
 
         self.n_retries = n_retries
         self.retry_delay_s = retry_delay_s
 
         self._sem = asyncio.Semaphore(max_concurrency)
+        # optional token-budget gate: small batches pack in while large ones
+        # serialize, instead of counting every task as equal
+        self._token_sem = (
+            WeightedSemaphore(max_inflight_tokens) if max_inflight_tokens else None
+        )
         self._completion_kwargs = completion_kwargs  # forwarded to LiteLLM
 
+        # pin one pooled HTTP client for all litellm calls: keep-alive
+        # connections get reused under high concurrency instead of paying
+        # a TLS handshake per request
+        if litellm.aclient_session is None:
+            litellm.aclient_session = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_concurrency * 2,
+                    max_keepalive_connections=max_concurrency,
+                )
+            )
+
+        # exact-match LRU over parsed responses: identical payloads within a
+        # run (duplicated topics, retried batches) skip the network entirely
+        self._response_cache: OrderedDict[str, Any] = OrderedDict()
+        self._cache_lock = asyncio.Lock()
+
     def _build_messages(
-        self, payload: Any, user_prefix: str | None
+        self,
+        payload: Any,
+        user_prefix: str | None,
+        payload_json: str | None = None,
     ) -> list[dict[str, str]]:
         prefix = user_prefix or ""
+        # orjson output is compact and non-ASCII by default: fewer prompt
+        # bytes, and serialization stays in C
+        body = (
+            payload_json
+            if payload_json is not None
+            else orjson.dumps(payload).decode()
+        )
         return [
-            {"role": "system", "content": self.system_prompt},
-            {
-                "role": "user",
-                "content": prefix + json.dumps(payload, ensure_ascii=False),
-            },
+            self._system_msg,
+            {"role": "user", "content": prefix + body},
         ]
 
     async def structured_call_async(
@@ -54,47 +121,99 @@ class LLMClient:
         response_format: type[T],
         payload: Any,
         user_prefix: str | None = None,
+        payload_json: str | None = None,
     ) -> T:
-        messages = self._build_messages(payload=payload, user_prefix=user_prefix)
+        """payload_json, when given, is the pre-serialized payload — callers
+        that already serialized it (e.g. for a cache key) skip a second pass."""
+        messages = self._build_messages(
+            payload=payload, user_prefix=user_prefix, payload_json=payload_json
+        )
+
+        cache_key = hashlib.blake2b(
+            f"{self.model_name}\x00{response_format.__name__}\x00"
+            f"{messages[-1]['content']}".encode(),
+            digest_size=16,
+        ).hexdigest()
+        async with self._cache_lock:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                self._response_cache.move_to_end(cache_key)
+                return cached
+
         total_attempts = 1 + self.n_retries
 
         last_content: str | None = None
         last_err: Exception | None = None
 
         for attempt in range(1, total_attempts + 1):
+            attempt_content: str | None = None
+            weight = (
+                sum(len(m["content"]) for m in messages) // CHARS_PER_TOKEN + 1
+            )
             try:
                 async with self._sem:
-                    resp = await acompletion(
-                        model=self.model_name,
-                        messages=messages,
-                        response_format=response_format,
-                        temperature=self.temperature,
-                        **self._completion_kwargs,
-                    )
+                    if self._token_sem:
+                        await self._token_sem.acquire(weight)
+                    try:
+                        resp = await acompletion(
+                            model=self.model_name,
+                            messages=messages,
+                            response_format=response_format,
+                            temperature=self.temperature,
+                            **self._completion_kwargs,
+                        )
+                    finally:
+                        if self._token_sem:
+                            await self._token_sem.release(weight)
 
-                last_content = (resp.choices[0].message.content or "").strip()  # type: ignore[attr-defined]
-                if not last_content:
+                attempt_content = (resp.choices[0].message.content or "").strip()  # type: ignore[attr-defined]
+                last_content = attempt_content
+                if not attempt_content:
                     raise ValueError("Empty response content from provider")
 
-                return response_format.model_validate_json(last_content)
+                result = response_format.model_validate_json(attempt_content)
+                async with self._cache_lock:
+                    self._response_cache[cache_key] = result
+                    self._response_cache.move_to_end(cache_key)
+                    while len(self._response_cache) > RESPONSE_CACHE_SIZE:
+                        self._response_cache.popitem(last=False)
+                return result
 
             except Exception as e:
                 last_err = e
 
                 if attempt < total_attempts:
+                    # for parse/validation failures, show the model its own
+                    # output and the error instead of retrying blind
+                    if attempt_content:
+                        messages = messages + [
+                            {"role": "assistant", "content": attempt_content},
+                            {
+                                "role": "user",
+                                "content": f"Your output had error: {e}. "
+                                "Fix it and return only valid JSON.",
+                            },
+                        ]
+
+                    # exponential backoff with jitter so many in-flight
+                    # coroutines hitting the same limit don't retry in step
+                    delay = (
+                        self.retry_delay_s * 2 ** (attempt - 1)
+                        + random.random() * 0.5
+                    )
                     snippet = (last_content or "")[:800].replace("\n", "\\n")
                     logger.warning(
                         "LLM JSON parse/validation failed (attempt {}/{}). Retrying in {}s. "
                         "model={} err={} content_snippet={}",
                         attempt,
                         total_attempts,
-                        self.retry_delay_s,
+                        delay,
                         self.model_name,
                         repr(e),
                         snippet,
                     )
-                    if self.retry_delay_s:
-                        await asyncio.sleep(self.retry_delay_s)
+                    if delay:
+                        await asyncio.sleep(delay)
                     continue
 
                 snippet = (last_content or "")[:800].replace("\n", "\\n")
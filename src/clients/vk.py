@@ -1,13 +1,23 @@
-from urllib.parse import urlparse
+import re
+import time
 
 import vk_api  # type: ignore[import-untyped]
 from vk_api.exceptions import ApiError  # type: ignore[import-untyped]
 
 VK_API_VERSION = "5.131"
 PAGE_SIZE = 100
+# VK allows up to 25 API calls inside one execute (VKScript) request
+EXECUTE_BATCH_SIZE = 25
 
 # for some reason vk_api doesn't have this
 INVALID_TOKEN_CODE = 5
+TOO_MANY_REQUESTS_CODE = 6
+
+MAX_RETRIES = 5
+
+VK_SLUG_PATTERN = re.compile(
+    r"^(?:https?://)?(?:www\.)?(?:m\.)?(?:vk\.com|vkontakte\.ru)/([^/?#]+)", re.I
+)
 
 
 def _is_invalid_token(e: BaseException) -> bool:
@@ -29,27 +39,38 @@ class VKClient:
             raise
 
     def call(self, fn, **params):
-        return fn(**params)
+        for attempt in range(MAX_RETRIES):
+            try:
+                return fn(**params)
+            except ApiError as e:
+                if e.code != TOO_MANY_REQUESTS_CODE or attempt == MAX_RETRIES - 1:
+                    raise
+                time.sleep(min(3.0, 0.35 * (2**attempt)))
+
+    def execute(self, code: str) -> list:
+        """Run a VKScript snippet bundling up to 25 API calls in one request."""
+        return self.call(self.api.execute, code=code) or []
 
     def paginate(self, fn, **params):
         offset = 0
-        while True:
-            r = self.call(fn, **params, count=PAGE_SIZE, offset=offset)
+        total: int | None = None
+        while total is None or offset < total:
+            r = self.call(fn, **params, count=self.page_size, offset=offset)
             items = r.get("items") or []
             if not items:
                 return
             yield from items
 
             offset += len(items)
-            if offset >= int(r.get("count") or 0):
-                return
+            total = int(r.get("count") or 0)
 
     @staticmethod
     def slug(group_url: str) -> str:
         s = (group_url or "").strip()
         if not s:
             return ""
-        if "vk.com/" in s or "vkontakte.ru/" in s:
-            s = urlparse(s if "://" in s else "https://" + s).path
+        m = VK_SLUG_PATTERN.match(s)
+        if m:
+            return m.group(1)
 
         return s.strip("/").split("/", 1)[0]
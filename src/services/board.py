@@ -1,7 +1,17 @@
-from src.clients.vk import VKClient  # type: ignore[import-untyped]
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import TypeAdapter
+
+from src.clients.vk import EXECUTE_BATCH_SIZE, VKClient  # type: ignore[import-untyped]
 from src.dto.dto_group import Board, Group, Topic
 
+TOPIC_LIST_ADAPTER = TypeAdapter(list[Topic])
+
 DEFAULT_GROUP_FIELDS = "screen_name,name,is_closed,description,members_count"
+# VK allows ~3 requests per second on a user token; keep in-flight executes below that
+MAX_PARALLEL_EXECUTES = 3
+# groups.getById accepts up to 500 comma-separated ids per call
+GROUPS_BATCH_SIZE = 500
 
 
 class VKBoardService:
@@ -19,30 +29,134 @@ class VKBoardService:
             )
             or []
         )
-        return Group.model_validate(items[0]) if items else None
+        if not items:
+            return None
+        return self._group_from_item(items[0])
+
+    def get_groups(self, group_inputs: list[str]) -> dict[str, Group | None]:
+        """Resolve many group URLs/slugs, 500 per groups.getById call."""
+        slugs = [self.client.slug(g) for g in group_inputs]
+        unique = list(dict.fromkeys(s for s in slugs if s))
+
+        by_slug: dict[str, Group] = {}
+        for i in range(0, len(unique), GROUPS_BATCH_SIZE):
+            chunk = unique[i : i + GROUPS_BATCH_SIZE]
+            items = (
+                self.client.call(
+                    self.client.api.groups.getById,
+                    group_ids=",".join(chunk),
+                    fields=self.fields,
+                )
+                or []
+            )
+            for item in items:
+                group = self._group_from_item(item)
+                # a slug may be a screen name or a clubN/publicN/plain id form
+                for key in (
+                    group.screen_name,
+                    f"club{group.id}",
+                    f"public{group.id}",
+                    str(group.id),
+                ):
+                    if key:
+                        by_slug.setdefault(key.lower(), group)
+
+        return {
+            inp: by_slug.get(slug.lower()) if slug else None
+            for inp, slug in zip(group_inputs, slugs)
+        }
+
+    @staticmethod
+    def _group_from_item(item: dict) -> Group:
+        # the VK response shape is trusted; skip field coercion
+        data = {k: v for k, v in item.items() if k in Group.model_fields}
+        return Group.model_construct(**data)
 
     def get_topic_messages(self, group_id: int, topic_id: int) -> list[str]:
         out: list[str] = []
         for c in self.client.paginate(
-            self.client.api.board.getComments, group_id=group_id, topic_id=topic_id
+            self.client.api.board.getComments,
+            group_id=group_id,
+            topic_id=topic_id,
+            need_likes=0,
+            extended=0,
         ):
             text = (c.get("text") or "").strip()
             if text:
                 out.append(text)
         return out
 
-    def dump_board(self, group: Group) -> Board:
-        topics: list[Topic] = []
-        for t in self.client.paginate(
-            self.client.api.board.getTopics, group_id=group.id
-        ):
-            topic_id = int(t["id"])
-            title = (t.get("title") or "").strip()
-            topics.append(
-                Topic(
-                    topic_id=topic_id,
-                    title=title,
-                    messages=self.get_topic_messages(group.id, topic_id),
+    def get_topics_messages_batch(
+        self, group_id: int, topic_ids: list[int]
+    ) -> dict[int, list[str]]:
+        """Fetch comments for many topics, 25 board.getComments per execute call."""
+        messages: dict[int, list[str]] = {tid: [] for tid in topic_ids}
+        pending: list[tuple[int, int]] = [(tid, 0) for tid in topic_ids]
+
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_EXECUTES) as pool:
+            while pending:
+                chunks = [
+                    pending[i : i + EXECUTE_BATCH_SIZE]
+                    for i in range(0, len(pending), EXECUTE_BATCH_SIZE)
+                ]
+                pending = []
+
+                responses_per_chunk = pool.map(
+                    lambda chunk: self._execute_comments_chunk(group_id, chunk),
+                    chunks,
                 )
+                for chunk, responses in zip(chunks, responses_per_chunk):
+                    for (tid, offset), r in zip(chunk, responses):
+                        if not isinstance(r, dict):
+                            continue
+                        items = r.get("items") or []
+                        for c in items:
+                            text = (c.get("text") or "").strip()
+                            if text:
+                                messages[tid].append(text)
+
+                        # re-queue topics with more pages for the next wave
+                        next_offset = offset + len(items)
+                        if items and next_offset < int(r.get("count") or 0):
+                            pending.append((tid, next_offset))
+
+        return messages
+
+    def _execute_comments_chunk(
+        self, group_id: int, chunk: list[tuple[int, int]]
+    ) -> list:
+        calls = ",".join(
+            f"API.board.getComments({{"
+            f'"group_id":{group_id},"topic_id":{tid},'
+            f'"count":{self.client.page_size},"offset":{offset},'
+            f'"need_likes":0,"extended":0}})'
+            for tid, offset in chunk
+        )
+        return self.client.execute(f"return [{calls}];")
+
+    def dump_board(self, group: Group) -> Board:
+        raw_topics = list(
+            self.client.paginate(
+                self.client.api.board.getTopics,
+                group_id=group.id,
+                preview=0,
+                extended=0,
             )
-        return Board(group=group, topics=topics)
+        )
+        topic_ids = [int(t["id"]) for t in raw_topics]
+        messages_by_topic = self.get_topics_messages_batch(group.id, topic_ids)
+
+        topics = TOPIC_LIST_ADAPTER.validate_python(
+            [
+                {
+                    "topic_id": int(t["id"]),
+                    "title": (t.get("title") or "").strip(),
+                    "messages": messages_by_topic.get(int(t["id"]), []),
+                }
+                for t in raw_topics
+            ]
+        )
+        # sort here, once, so consumers can rely on topic_id order in dumps
+        topics.sort(key=lambda t: t.topic_id)
+        # group and topics are already validated; skip re-validation on assembly
+        return Board.model_construct(group=group, topics=topics)
@@ -1,9 +1,11 @@
 import asyncio
+import csv
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Generator, Generic, TypeVar
 
+import numpy as np
 import pandas as pd
 from loguru import logger
 from pydantic import BaseModel
@@ -11,7 +13,7 @@ from tqdm import tqdm
 
 from src.clients.llm import LLMClient
 from src.dto.dto_wishes import TopicTextPayload
-from src.utils import remove_emojis
+from src.utils import EMOJI_PATTERN
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -48,80 +50,135 @@ class BaseWishExtractor(ABC, Generic[T]):
         if filtered_topics.empty:
             return []
 
-        # Clean message text
-        messages_df = messages_df.copy()
-        messages_df["message_text"] = (
-            messages_df["message_text"].fillna("").apply(remove_emojis)
-        )
-
-        # Join with topic data
+        # Join with topic data first so cleaning only touches relevant rows;
+        # both sides are projected to the columns the join and payload use.
+        # No post-merge sort: messages.csv is written by flatten_data in
+        # (place_id, topic_id, message_idx) order and an inner merge
+        # preserves the left frame's key order
         relevant_messages = pd.merge(
-            messages_df,
+            messages_df[
+                ["place_id", "group_id", "topic_id", "message_idx", "message_text"]
+            ],
             filtered_topics[["place_id", "group_id", "topic_id", "topic_title"]],
             on=["place_id", "group_id", "topic_id"],
             how="inner",
-        ).sort_values(["place_id", "group_id", "topic_id", "message_idx"])
+        )
+
+        # Clean message text in vectorized passes, drop rows left empty.
+        # Cheap non-ASCII pre-check first: pure-ASCII rows (most of any
+        # chat corpus) skip the big emoji character-class sweep entirely
+        text = relevant_messages["message_text"].fillna("").astype(str)
+        non_ascii = text.str.contains(r"[^\x00-\x7f]", regex=True, na=False)
+        if non_ascii.any():
+            text.loc[non_ascii] = text.loc[non_ascii].str.replace(
+                EMOJI_PATTERN, "", regex=True
+            )
+        text = text.str.strip()
+        keep = text.str.len() > 0
+        relevant_messages = relevant_messages[keep]
+        if relevant_messages.empty:
+            return []
 
-        # Format as TopicTextPayload
+        topic_text = (
+            "[msg "
+            + relevant_messages["message_idx"].astype("int64").astype(str)
+            + "]\n"
+            + text[keep]
+        )
+
+        # Format as TopicTextPayload; values are already cleaned and typed,
+        # so model_construct skips a per-row validation pass
+        ids = (
+            relevant_messages[["place_id", "group_id", "topic_id"]]
+            .astype("int64")
+            .to_numpy()
+        )
+        titles = relevant_messages["topic_title"].fillna("").astype(str).to_numpy()
         return [
-            TopicTextPayload(
-                place_id=int(row.place_id),
-                group_id=int(row.group_id),
-                topic_id=int(row.topic_id),
-                topic_title=str(row.topic_title or ""),
-                topic_text=f"[msg {int(row.message_idx)}]\n{row.message_text.strip()}",
+            TopicTextPayload.model_construct(
+                place_id=int(place_id),
+                group_id=int(group_id),
+                topic_id=int(topic_id),
+                topic_title=title,
+                topic_text=body,
+            )
+            for (place_id, group_id, topic_id), title, body in zip(
+                ids, titles, topic_text.to_numpy()
             )
-            for row in relevant_messages.itertuples()
-            if row.message_text.strip()
         ]
 
     def create_batches(
         self,
         items: list[TopicTextPayload],
     ) -> Generator[list[TopicTextPayload], None, None]:
-        """Batch items respecting character and item limits."""
-        current_batch: list[TopicTextPayload] = []
-        current_size = 0
-
-        for item in items:
-            item_size = len(item.topic_text)
+        """Batch items respecting character and item limits.
+
+        Sizes are gathered into one int array up front so the greedy
+        boundary scan works on plain ints and yields list slices — no
+        per-item attribute lookups or append calls in the hot loop.
+
+        Cuts prefer topic edges: when a limit lands mid-topic and the
+        current batch contains an earlier topic boundary, the batch is
+        cut there instead, so one topic's messages land in one request
+        whenever the limits allow (a topic larger than a whole batch is
+        still hard-split).
+        """
+        if not items:
+            return
+
+        sizes = np.fromiter(
+            (len(item.topic_text) for item in items), dtype=np.int64, count=len(items)
+        )
+        keys = [(item.place_id, item.group_id, item.topic_id) for item in items]
+        sep_len = len(self.SEPARATOR)
+        max_chars = self.config.max_batch_chars
+        max_items = self.config.max_batch_items
 
-            if current_batch:
-                new_size = current_size + len(self.SEPARATOR) + item_size
+        start = 0
+        current_size = 0
+        for idx in range(len(items)):
+            item_size = int(sizes[idx])
+
+            # re-check after every cut: the carried-over tail plus the
+            # current item may still exceed the limits, in which case the
+            # second pass finds no topic edge inside the tail and
+            # hard-splits at idx
+            while idx > start:
                 exceeds_chars = (
-                    self.config.max_batch_chars
-                    and new_size > self.config.max_batch_chars
+                    max_chars and current_size + sep_len + item_size > max_chars
                 )
-                exceeds_items = (
-                    self.config.max_batch_items
-                    and len(current_batch) >= self.config.max_batch_items
+                exceeds_items = max_items and idx - start >= max_items
+                if not (exceeds_chars or exceeds_items):
+                    break
+
+                cut = idx
+                if keys[idx - 1] == keys[idx]:
+                    for j in range(idx - 1, start, -1):
+                        if keys[j - 1] != keys[j]:
+                            cut = j
+                            break
+
+                yield items[start:cut]
+                start = cut
+                # size of the carried-over tail items[cut:idx]
+                current_size = int(sizes[cut:idx].sum()) + sep_len * max(
+                    0, idx - cut - 1
                 )
 
-                if exceeds_chars or exceeds_items:
-                    yield current_batch
-                    current_batch = []
-                    current_size = 0
+            current_size += item_size + (sep_len if current_size > 0 else 0)
 
-            current_batch.append(item)
-            current_size += item_size + (len(self.SEPARATOR) if current_size > 0 else 0)
-
-        if current_batch:
-            yield current_batch
+        yield items[start:]
 
     def prepare_batch_payload(
         self, batch: list[TopicTextPayload]
     ) -> list[dict[str, Any]]:
-        """Convert batch to LLM input format."""
-        return [
-            {
-                "place_id": item.place_id,
-                "group_id": item.group_id,
-                "topic_id": item.topic_id,
-                "topic_title": item.topic_title,
-                "topic_text": item.topic_text,
-            }
-            for item in batch
-        ]
+        """Convert batch to LLM input format.
+
+        TopicTextPayload is flat and holds exactly the five fields the
+        prompt expects, so the dicts pydantic already keeps per instance
+        are reused instead of rebuilt; callers treat them as read-only.
+        """
+        return [item.__dict__ for item in batch]
 
     async def process_batch_async(
         self,
@@ -150,16 +207,19 @@ class BaseWishExtractor(ABC, Generic[T]):
         batch: list[TopicTextPayload],
         batch_num: int,
         total_batches: int,
-        batch_dir: Path,
+        writer: "csv.DictWriter",
+        write_lock: asyncio.Lock,
+        fh: Any,
     ) -> list[T]:
-        """Process batch and save intermediate results."""
+        """Process batch and append its raw rows to the shared CSV."""
         batch_results = await self.process_batch_async(batch, batch_num, total_batches)
-        batch_df = await asyncio.to_thread(self.clean_results, batch_results)
 
-        if not batch_df.empty:
-            await asyncio.to_thread(
-                batch_df.to_csv, batch_dir / f"{batch_num}.csv", index=False
-            )
+        # raw rows go straight through the shared writer — no per-batch
+        # DataFrame; cleaning and dedup happen once over all results
+        if batch_results:
+            async with write_lock:
+                writer.writerows(r.model_dump() for r in batch_results)
+                fh.flush()
 
         return batch_results
 
@@ -183,25 +243,48 @@ class BaseWishExtractor(ABC, Generic[T]):
         batch_dir = output_path.parent / f"{self.config.batch_subdir}"
         batch_dir.mkdir(parents=True, exist_ok=True)
 
-        # Process batches concurrently
-        tasks: list[asyncio.Task[list[T]]] = []
-        for i, batch in enumerate(batches, 1):
-            task = asyncio.create_task(
-                self.process_and_persist_batch(batch, i, len(batches), batch_dir)
-            )
-            tasks.append(task)
-
-        # Collect results
-        all_results: list[T] = []
-        for future in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
-            try:
-                batch_results = await future
-                all_results.extend(batch_results)
-            except Exception:
-                logger.exception("Batch processing failed")
-
-        # Combine and deduplicate results
-        return await asyncio.to_thread(self.clean_results, all_results)
+        # One shared CSV collects raw rows as batches finish: crash-resilient
+        # partial output without a DataFrame round-trip per batch, and the
+        # only copy of the rows — results are not retained in memory
+        raw_csv = batch_dir / "raw_rows.csv"
+        write_lock = asyncio.Lock()
+
+        # extractor-level gate: keeps in-flight batches at max_concurrency
+        # even when the shared client serves several extractors
+        sem = asyncio.Semaphore(self.config.max_concurrency)
+
+        with raw_csv.open("w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=self.get_output_columns())
+            writer.writeheader()
+
+            async def run_batch(batch: list[TopicTextPayload], num: int) -> list[T]:
+                async with sem:
+                    return await self.process_and_persist_batch(
+                        batch, num, len(batches), writer, write_lock, fh
+                    )
+
+            # Process batches concurrently
+            tasks: list[asyncio.Task[list[T]]] = []
+            for i, batch in enumerate(batches, 1):
+                tasks.append(asyncio.create_task(run_batch(batch, i)))
+
+            # Collect results: one gather instead of a waiter per task,
+            # with progress ticked from done-callbacks
+            pbar = tqdm(total=len(tasks))
+            for task in tasks:
+                task.add_done_callback(lambda _: pbar.update(1))
+
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            pbar.close()
+
+            for result in results:
+                if isinstance(result, BaseException):
+                    logger.error("Batch processing failed: {!r}", result)
+
+        # Combine and deduplicate from the streamed file, so peak memory is
+        # one response plus the final frame rather than every row ever seen
+        raw_df = await asyncio.to_thread(pd.read_csv, raw_csv, engine="pyarrow")
+        return await asyncio.to_thread(self.clean_frame, raw_df)
 
     def save_empty_output(self, output_path: Path) -> None:
         """Save empty CSV with appropriate columns."""
@@ -214,8 +297,8 @@ class BaseWishExtractor(ABC, Generic[T]):
         pass
 
     @abstractmethod
-    def clean_results(self, results: list[T]) -> pd.DataFrame:
-        """Clean and deduplicate extracted results."""
+    def clean_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clean and deduplicate a frame of raw extracted rows."""
         pass
 
     @abstractmethod